@@ -1,16 +1,33 @@
-from flask import Flask, jsonify, request, session, send_from_directory
+from flask import Flask, jsonify, request, session, send_from_directory, abort, make_response
 from flask_session import Session
 from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
 import os
-from db import db, User, Article, Outlet, initialize_outlets, fetch_and_store_feeds, generate_article_tts
+from datetime import datetime, timedelta
+from db import db, User, Article, Outlet, Change, saved_articles, migrate_schema, initialize_outlets, fetch_and_store_feeds, generate_article_tts, record_change, latest_change_token, compact_change_log, apply_retention, parse_article_fields, article_query_options, get_article_thumbnail, thumbnail_version, THUMBNAIL_SIZES, THUMBNAIL_DIR, related_index, FeedEntry, update_user_feed, rebuild_user_feeds, FEED_SIZE, get_saved_ids, OutletStats, bump_save_count, reconcile_stats
 
 app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///articles.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///articles.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SECRET_KEY"] = "b27008c9130ade5a76e9d4ff7f7dffad4ff1605ce103da2dd115d9402ae58e20"
 app.config["SESSION_TYPE"] = "filesystem"
 
+# Retention: compress article bodies after this many days, optionally purge unsaved articles
+app.config["RETENTION_ARCHIVE_DAYS"] = 30
+app.config["RETENTION_PURGE_DAYS"] = None
+
+# Maximum number of ids accepted by /articles/batch
+app.config["MAX_BATCH_SIZE"] = 200
+
+# Trending = most saved among articles published in the last N hours
+app.config["TRENDING_WINDOW_HOURS"] = 72
+
+# Related-articles vector index, persisted next to the database
+app.config["RELATED_INDEX_PATH"] = os.path.join(app.instance_path, "related_index.npz")
+
+# Largest id SQLite can store (signed 64-bit INTEGER)
+MAX_ARTICLE_ID = 2**63 - 1
+
 # Initialize extensions
 db.init_app(app)
 Session(app)
@@ -21,6 +38,14 @@ def index():
     return "Scope Backend: https://github.com/bchucs/scope-backend", 200 
 
 
+def get_requested_fields():
+    """Parse the ?fields= query parameter, aborting with a 400 on unknown field names."""
+    try:
+        return parse_article_fields(request.args.get('fields'))
+    except ValueError as e:
+        abort(make_response(jsonify({"error": str(e)}), 400))
+
+
 # Article endpoints
 @app.route("/articles")
 def list_articles():
@@ -29,37 +54,143 @@ def list_articles():
     If user is logged in, includes saved status for each article.
     """
     user_id = session.get('user_id')
-    articles = Article.query.order_by(Article.pub_date.desc()).all()
-    return jsonify([a.to_dict(user_id=user_id) for a in articles])
+    fields = get_requested_fields()
+
+    articles = Article.query.options(*article_query_options(fields)).order_by(Article.pub_date.desc()).all()
+    return jsonify([a.to_dict(user_id=user_id, fields=fields) for a in articles])
 
 @app.route("/articles/<int:article_id>")
 def get_article(article_id):
     """Get a specific article by ID."""
     user_id = session.get('user_id')
-    article = Article.query.get(article_id)
+    fields = get_requested_fields()
+
+    article = Article.query.options(*article_query_options(fields)).filter_by(id=article_id).first()
 
     if not article:
         return jsonify({"error": "Article not found"}), 404
 
-    return jsonify(article.to_dict(user_id=user_id)), 200
+    return jsonify(article.to_dict(user_id=user_id, fields=fields)), 200
+
+@app.route("/articles/batch", methods=["GET", "POST"])
+def get_articles_batch():
+    """
+    Get many articles by ID in one request, in the requested order.
+    IDs come from ?ids=1,2,3 or a JSON body {"ids": [1, 2, 3]}.
+    IDs that don't exist are returned as {"id": ..., "error": "Article not found"}.
+    """
+    user_id = session.get('user_id')
+    fields = get_requested_fields()
+
+    if request.method == "POST":
+        data = request.get_json(silent=True)
+        raw_ids = data.get('ids') if isinstance(data, dict) else None
+    else:
+        raw_ids = [i.strip() for i in request.args.get('ids', '').split(',') if i.strip()]
+
+    if not raw_ids or not isinstance(raw_ids, list):
+        return jsonify({"error": "Missing ids"}), 400
+
+    if len(raw_ids) > app.config["MAX_BATCH_SIZE"]:
+        return jsonify({"error": f"Too many ids (max {app.config['MAX_BATCH_SIZE']})"}), 400
+
+    # JSON ids must be integers (not 1.7 or true); query string ids must be ASCII digits.
+    # Either way they must fit SQLite's signed 64-bit INTEGER.
+    if request.method == "POST":
+        ids = [i for i in raw_ids if isinstance(i, int) and not isinstance(i, bool)]
+    else:
+        ids = [int(i) for i in raw_ids if i.isascii() and i.isdigit()]
+    if len(ids) != len(raw_ids) or not all(0 < i <= MAX_ARTICLE_ID for i in ids):
+        return jsonify({"error": "Invalid article id"}), 400
+
+    articles = {a.id: a for a in Article.query.options(*article_query_options(fields)).filter(Article.id.in_(set(ids))).all()}
+    saved_ids = get_saved_ids(user_id, articles.keys()) if user_id is not None else None
+
+    results = []
+    for article_id in ids:
+        article = articles.get(article_id)
+        if article:
+            results.append(article.to_dict(user_id=user_id, fields=fields, saved_ids=saved_ids))
+        else:
+            results.append({"id": article_id, "error": "Article not found"})
+
+    return jsonify(results), 200
 
 @app.route("/articles/top/<int:top_k>")
 def get_top_articles(top_k):
     """Get the top K most recent articles."""
     user_id = session.get('user_id')
-    articles = Article.query.order_by(Article.pub_date.desc()).limit(top_k).all()
-    return jsonify([a.to_dict(user_id=user_id) for a in articles]), 200
+    fields = get_requested_fields()
+
+    articles = Article.query.options(*article_query_options(fields)).order_by(Article.pub_date.desc()).limit(top_k).all()
+    return jsonify([a.to_dict(user_id=user_id, fields=fields) for a in articles]), 200
+
+@app.route("/articles/most-saved/<int:top_k>")
+def get_most_saved_articles(top_k):
+    """Get the top K most saved articles of all time."""
+    user_id = session.get('user_id')
+    fields = get_requested_fields()
+
+    articles = Article.query.options(*article_query_options(fields)).filter(Article.save_count > 0).order_by(
+        Article.save_count.desc(), Article.pub_date.desc()).limit(top_k).all()
+    return jsonify([a.to_dict(user_id=user_id, fields=fields) for a in articles]), 200
+
+@app.route("/articles/trending/<int:top_k>")
+def get_trending_articles(top_k):
+    """Get the top K most saved articles published within the trending window."""
+    user_id = session.get('user_id')
+    fields = get_requested_fields()
+
+    cutoff = datetime.now() - timedelta(hours=app.config["TRENDING_WINDOW_HOURS"])
+    articles = Article.query.options(*article_query_options(fields)).filter(
+        Article.pub_date >= cutoff, Article.save_count > 0
+    ).order_by(Article.save_count.desc(), Article.pub_date.desc()).limit(top_k).all()
+    return jsonify([a.to_dict(user_id=user_id, fields=fields) for a in articles]), 200
+
+@app.route("/articles/<int:article_id>/related")
+def get_related_articles(article_id):
+    """Get the articles most similar to a given article, by title and text."""
+    user_id = session.get('user_id')
+    fields = get_requested_fields()
+
+    k = request.args.get('k', 10, type=int)
+    k = max(1, min(k, 50))
+
+    related_index.ensure_loaded(app.config["RELATED_INDEX_PATH"])
+
+    if not db.session.query(Article.id).filter_by(id=article_id).first():
+        return jsonify({"error": "Article not found"}), 404
+
+    matches = related_index.related(article_id, k)
+    scores = dict(matches)
+
+    articles = Article.query.options(*article_query_options(fields)).filter(Article.id.in_(scores.keys())).all() if scores else []
+    articles.sort(key=lambda a: scores[a.id], reverse=True)
+
+    results = []
+    for a in articles:
+        result = a.to_dict(user_id=user_id, fields=fields)
+        result["score"] = round(scores[a.id], 4)
+        results.append(result)
+
+    return jsonify(results), 200
 
 @app.route("/outlets")
 def list_outlets():
-    """List all parent news outlets (outlets without a parent)."""
+    """
+    List all parent news outlets (outlets without a parent).
+    Includes article counts and latest publication dates across each outlet's children.
+    """
     outlets = Outlet.query.filter_by(parent_outlet_id=None).all()
-    return jsonify([o.to_dict() for o in outlets]), 200
+    stats = {s.outlet_id: s for s in OutletStats.query.all()}
+    return jsonify([o.to_dict(stats=stats) for o in outlets]), 200
 
 @app.route("/articles/outlet/<int:outlet_id>")
 def get_articles_by_outlet(outlet_id):
     """Get articles from a specific outlet and all its child outlets."""
     user_id = session.get('user_id')
+    fields = get_requested_fields()
+
     outlet = Outlet.query.get(outlet_id)
 
     if not outlet:
@@ -70,13 +201,15 @@ def get_articles_by_outlet(outlet_id):
     if outlet.children:
         outlet_ids.extend([child.id for child in outlet.children])
 
-    articles = Article.query.filter(Article.outlet_id.in_(outlet_ids)).order_by(Article.pub_date.desc()).all()
-    return jsonify([a.to_dict(user_id=user_id) for a in articles]), 200
+    articles = Article.query.options(*article_query_options(fields)).filter(Article.outlet_id.in_(outlet_ids)).order_by(Article.pub_date.desc()).all()
+    return jsonify([a.to_dict(user_id=user_id, fields=fields) for a in articles]), 200
 
 @app.route("/articles/outlet/<int:outlet_id>/top/<int:top_k>")
 def get_top_articles_by_outlet(outlet_id, top_k):
     """Get the top K most recent articles from a specific outlet and all its child outlets."""
     user_id = session.get('user_id')
+    fields = get_requested_fields()
+
     outlet = Outlet.query.get(outlet_id)
 
     if not outlet:
@@ -87,8 +220,8 @@ def get_top_articles_by_outlet(outlet_id, top_k):
     if outlet.children:
         outlet_ids.extend([child.id for child in outlet.children])
 
-    articles = Article.query.filter(Article.outlet_id.in_(outlet_ids)).order_by(Article.pub_date.desc()).limit(top_k).all()
-    return jsonify([a.to_dict(user_id=user_id) for a in articles]), 200
+    articles = Article.query.options(*article_query_options(fields)).filter(Article.outlet_id.in_(outlet_ids)).order_by(Article.pub_date.desc()).limit(top_k).all()
+    return jsonify([a.to_dict(user_id=user_id, fields=fields) for a in articles]), 200
 
 
 @app.route("/articles/saved")
@@ -99,13 +232,42 @@ def get_saved_articles():
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
 
+    fields = get_requested_fields()
+
     user = User.query.get(user_id)
 
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    saved_articles = user.saved_articles.order_by(Article.pub_date.desc()).all()
-    return jsonify([a.to_dict(user_id=user_id) for a in saved_articles]), 200
+    saved_articles = user.saved_articles.options(*article_query_options(fields)).order_by(Article.pub_date.desc()).all()
+    return jsonify([a.to_dict(user_id=user_id, fields=fields) for a in saved_articles]), 200
+
+
+@app.route("/feed/me")
+def get_personalized_feed():
+    """
+    Get the current user's personalized feed, ranked by recency and affinity
+    to the outlets and topics of their saved articles.
+    Falls back to the most recent articles if the user has no feed yet.
+    """
+    user_id = session.get('user_id')
+
+    if not user_id:
+        return jsonify({"error": "Not authenticated"}), 401
+
+    fields = get_requested_fields()
+
+    articles = Article.query.options(*article_query_options(fields)).join(
+        FeedEntry, FeedEntry.article_id == Article.id
+    ).filter(FeedEntry.user_id == user_id).order_by(FeedEntry.score.desc()).all()
+
+    # Saved articles are never kept in the materialized feed, so no saved lookup is needed
+    saved_ids = set()
+    if not articles:
+        articles = Article.query.options(*article_query_options(fields)).order_by(Article.pub_date.desc()).limit(FEED_SIZE).all()
+        saved_ids = get_saved_ids(user_id, [a.id for a in articles])
+
+    return jsonify([a.to_dict(user_id=user_id, fields=fields, saved_ids=saved_ids) for a in articles]), 200
 
 
 @app.route("/articles/<int:article_id>/save", methods=["POST"])
@@ -126,6 +288,9 @@ def save_article(article_id):
         return jsonify({"message": "Article already saved"}), 200
 
     user.saved_articles.append(article)
+    record_change("saved", article.id, user_id=user.id)
+    bump_save_count(article, 1)
+    update_user_feed(user.id)
     db.session.commit()
 
     return jsonify({"message": "Article saved successfully"}), 200
@@ -149,6 +314,9 @@ def unsave_article(article_id):
         return jsonify({"message": "Article not saved"}), 200
 
     user.saved_articles.remove(article)
+    record_change("saved", article.id, user_id=user.id, deleted=True)
+    bump_save_count(article, -1)
+    update_user_feed(user.id)
     db.session.commit()
 
     return jsonify({"message": "Article unsaved successfully"}), 200
@@ -162,7 +330,9 @@ def generate_audio(article_id):
     if not article:
         return jsonify({"error": "Article not found"}), 404
 
-    if not article.text:
+    text = article.get_text()
+
+    if not text:
         return jsonify({"error": "Article has no text content"}), 400
 
     # Check if audio already exists
@@ -170,24 +340,142 @@ def generate_audio(article_id):
         return jsonify({"message": "Audio already exists", "audio_file": article.audio_file}), 200
 
     # Generate TTS
-    filename = generate_article_tts(article.id, article.text)
+    filename = generate_article_tts(article.id, text)
 
     if not filename:
         return jsonify({"error": "Failed to generate audio"}), 500
 
     # Update article with audio file path
     article.audio_file = filename
+    record_change("article", article.id)
     db.session.commit()
 
     return jsonify({"message": "Audio generated successfully", "audio_file": filename}), 201
 
 
+@app.route("/sync")
+def sync():
+    """
+    Return only what changed since the given sync token.
+    Without a token, returns a full snapshot. Saved-set changes are
+    included only if the user is logged in. Articles whose only change is
+    their save count come back as {"id", "save_count"} pairs in save_counts.
+    """
+    user_id = session.get('user_id')
+
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"error": "Invalid sync token"}), 400
+
+    if since < 0:
+        return jsonify({"error": "Invalid sync token"}), 400
+
+    fields = get_requested_fields()
+
+    token = latest_change_token()
+
+    # A token from the future means the database was reset or restored;
+    # the client's local state can't be reconciled incrementally.
+    if since > token:
+        return jsonify({"error": "Full resync required", "token": token}), 409
+
+    if since == 0:
+        articles = Article.query.options(*article_query_options(fields)).order_by(Article.pub_date.desc()).all()
+        saved_ids = None
+        if user_id:
+            saved_ids = set(article_id for (article_id,) in db.session.query(saved_articles.c.article_id).filter(
+                saved_articles.c.user_id == user_id))
+        result = {
+            "token": token,
+            "articles": [a.to_dict(user_id=user_id, fields=fields, saved_ids=saved_ids) for a in articles],
+            "deleted": [],
+            "save_counts": [],
+        }
+        if user_id:
+            result["saved"] = sorted(saved_ids)
+            result["unsaved"] = []
+        return jsonify(result), 200
+
+    kinds = [Change.kind.in_(["article", "save_count"])]
+    if user_id:
+        kinds.append(db.and_(Change.kind == "saved", Change.user_id == user_id))
+    query = Change.query.filter(Change.id > since, Change.id <= token, db.or_(*kinds))
+
+    # Collapse the log to the latest state of each article / saved entry
+    article_deleted = {}
+    saved_deleted = {}
+    count_ids = set()
+    for change in query.order_by(Change.id).all():
+        if change.kind == "save_count":
+            count_ids.add(change.article_id)
+            continue
+        target = article_deleted if change.kind == "article" else saved_deleted
+        target[change.article_id] = change.deleted
+
+    updated_ids = [article_id for article_id, deleted in article_deleted.items() if not deleted]
+    articles = []
+    if updated_ids:
+        articles = Article.query.options(*article_query_options(fields)).filter(Article.id.in_(updated_ids)).order_by(Article.pub_date.desc()).all()
+    saved_ids = get_saved_ids(user_id, updated_ids) if user_id else None
+
+    # Save count changes for articles that aren't being resent in full
+    count_ids -= set(article_deleted)
+    save_counts = []
+    if count_ids and (fields is None or "save_count" in fields):
+        save_counts = [{"id": article_id, "save_count": count} for article_id, count in db.session.query(
+            Article.id, Article.save_count).filter(Article.id.in_(count_ids)).order_by(Article.id)]
+
+    result = {
+        "token": token,
+        "articles": [a.to_dict(user_id=user_id, fields=fields, saved_ids=saved_ids) for a in articles],
+        "deleted": [article_id for article_id, deleted in article_deleted.items() if deleted],
+        "save_counts": save_counts,
+    }
+    if user_id:
+        result["saved"] = [article_id for article_id, deleted in saved_deleted.items() if not deleted]
+        result["unsaved"] = [article_id for article_id, deleted in saved_deleted.items() if deleted]
+
+    return jsonify(result), 200
+
+
 @app.route("/audios/<path:filename>")
 def serve_audio(filename):
     """Serve audio files from the audios directory."""
     return send_from_directory('audios', filename)
 
 
+@app.route("/images/<int:article_id>/<size>")
+def serve_thumbnail(article_id, size):
+    """
+    Serve a resized, locally cached thumbnail of an article's image.
+    Requests carrying the current ?v= version (as linked from article payloads)
+    are cached as immutable; anything else gets a short max-age plus an ETag.
+    """
+    if size not in THUMBNAIL_SIZES:
+        return jsonify({"error": "Invalid image size"}), 400
+
+    article = Article.query.options(db.load_only(Article.image_url)).filter_by(id=article_id).first()
+
+    if not article:
+        return jsonify({"error": "Article not found"}), 404
+
+    if not article.image_url:
+        return jsonify({"error": "Article has no image"}), 404
+
+    filename = get_article_thumbnail(article.id, article.image_url, size)
+
+    if not filename:
+        return jsonify({"error": "Failed to generate thumbnail"}), 502
+
+    response = send_from_directory(THUMBNAIL_DIR, filename, mimetype="image/webp")
+    if request.args.get('v') == thumbnail_version(article.image_url):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "public, max-age=300"
+    return response
+
+
 # Authentication endpoints
 @app.route("/auth/register", methods=["POST"])
 def register():
@@ -266,8 +554,20 @@ def start_scheduler():
     def scheduled_job():
         with app.app_context():
             fetch_and_store_feeds()
+            rebuild_user_feeds()
+
+    def retention_job():
+        with app.app_context():
+            apply_retention(app.config["RETENTION_ARCHIVE_DAYS"], app.config["RETENTION_PURGE_DAYS"])
+            compact_change_log()
+
+    def reconcile_job():
+        with app.app_context():
+            reconcile_stats()
 
     scheduler.add_job(scheduled_job, "interval", minutes=15)
+    scheduler.add_job(retention_job, "interval", hours=24)
+    scheduler.add_job(reconcile_job, "interval", hours=24)
     scheduler.start()
     atexit.register(lambda: scheduler.shutdown(wait=False))
 
@@ -275,7 +575,11 @@ def start_scheduler():
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+        migrate_schema()
         initialize_outlets()
+        reconcile_stats()
+        related_index.ensure_loaded(app.config["RELATED_INDEX_PATH"])
         fetch_and_store_feeds()
+        rebuild_user_feeds()
         start_scheduler()
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import OperationalError
 from werkzeug.security import generate_password_hash, check_password_hash
 import feedparser
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+import math
 import re
 import html
 import requests
@@ -10,12 +12,46 @@ import ssl
 import urllib.request
 from bs4 import BeautifulSoup
 from gtts import gTTS
+from PIL import Image
+import io
 import os
+import zlib
+import hashlib
+import sqlite3
+import threading
+import numpy as np
 
 ssl._create_default_https_context = ssl._create_unverified_context
 
 db = SQLAlchemy()
 
+# Existing articles published within this window are re-scraped on every ingest cycle,
+# but not more often than RESCRAPE_MIN_INTERVAL (articles can appear in several feeds)
+RESCRAPE_FRESHNESS_WINDOW = timedelta(hours=6)
+RESCRAPE_MIN_INTERVAL = timedelta(minutes=10)
+
+# Thumbnail widths served from /images/<article_id>/<size>
+THUMBNAIL_SIZES = {"small": 160, "medium": 480, "large": 1024}
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_CACHE_MAX_BYTES = 500 * 1024 * 1024
+MAX_SOURCE_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Related-articles index: hashed bag-of-words vectors (title words count double)
+RELATED_VECTOR_DIM = 256
+RELATED_TITLE_WEIGHT = 2.0
+# Queries scan a smaller random projection of the vectors (a quarter of the memory
+# traffic), then rerank the best candidates with the full vectors.
+RELATED_COARSE_DIM = 64
+RELATED_RERANK_CANDIDATES = 3072
+RELATED_PROJECTION = (
+    np.random.default_rng(0).standard_normal((RELATED_VECTOR_DIM, RELATED_COARSE_DIM)) / np.sqrt(RELATED_COARSE_DIM)
+).astype(np.float32)
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could for from had has have he her his how i if in
+into is it its just more most new not of on one or our out over said she so some than that the their them then there
+these they this to up was we were what when which who will with would you your
+""".split())
+
 # Helper functions
 def parse_pub_date(entry):
     try:
@@ -28,6 +64,23 @@ def parse_pub_date(entry):
     return None
 
 
+def parse_updated_date(entry):
+    """Return the feed entry's updated timestamp, if it has one."""
+    try:
+        if hasattr(entry, "updated_parsed") and entry.updated_parsed:
+            return datetime.fromtimestamp(time.mktime(entry.updated_parsed))
+    except Exception:
+        pass
+    return None
+
+
+def compute_content_hash(text):
+    """Return the SHA-256 hex digest of an article body (None if there is no body)."""
+    if not text:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def get_image_url(entry):
     try:
         if hasattr(entry, "media_content") and entry.media_content:
@@ -131,6 +184,105 @@ def generate_article_tts(article_id, text):
         return None
 
 
+def thumbnail_version(image_url):
+    """Short hash of the image URL; changes whenever an article's image changes."""
+    return hashlib.sha1(image_url.encode("utf-8")).hexdigest()[:12]
+
+
+def thumbnail_filename(article_id, image_url, size):
+    """Cache filename for a thumbnail; keyed on the image URL so a changed image gets a new file."""
+    return f"{article_id}_{size}_{thumbnail_version(image_url)}.webp"
+
+
+def evict_thumbnails(max_bytes=None):
+    """
+    Delete least recently used thumbnails until the cache fits in max_bytes.
+    Files removed concurrently by another request are skipped, and files still
+    being written (.tmp) are left alone.
+    """
+    if max_bytes is None:
+        max_bytes = THUMBNAIL_CACHE_MAX_BYTES
+
+    entries = []
+    for name in os.listdir(THUMBNAIL_DIR):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(THUMBNAIL_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def get_article_thumbnail(article_id, image_url, size):
+    """
+    Return the cached thumbnail filename for an article image, generating it if needed.
+    The original image is downloaded once and every size is produced from it.
+    """
+    filename = thumbnail_filename(article_id, image_url, size)
+    filepath = os.path.join(THUMBNAIL_DIR, filename)
+
+    try:
+        # Touch the file so eviction treats it as recently used
+        os.utime(filepath)
+        return filename
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        response = requests.get(image_url, headers=headers, timeout=10, stream=True)
+        response.raise_for_status()
+
+        data = response.raw.read(MAX_SOURCE_IMAGE_BYTES + 1, decode_content=True)
+        if len(data) > MAX_SOURCE_IMAGE_BYTES:
+            print(f"Image too large for article {article_id}: {image_url}")
+            return None
+
+        original = Image.open(io.BytesIO(data))
+        original = original.convert("RGBA" if original.mode in ("RGBA", "LA", "P") else "RGB")
+
+        for size_name, width in THUMBNAIL_SIZES.items():
+            thumbnail = original.copy()
+            thumbnail.thumbnail((width, width * 4))
+            # Write to a private temp file and rename, so concurrent requests never see a partial file
+            target = os.path.join(THUMBNAIL_DIR, thumbnail_filename(article_id, image_url, size_name))
+            tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                thumbnail.save(tmp_path, "WEBP", quality=80)
+                os.replace(tmp_path, target)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        print(f"Generated thumbnails for article {article_id}")
+    except Exception as e:
+        print(f"Error generating thumbnails for article {article_id}: {e}")
+        return None
+
+    try:
+        evict_thumbnails()
+    except OSError as e:
+        print(f"Error evicting thumbnails: {e}")
+
+    return filename if os.path.exists(filepath) else None
+
+
 # Association table for many-to-many relationship between users and saved articles
 saved_articles = db.Table('saved_articles',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
@@ -173,8 +325,13 @@ class Outlet(db.Model):
     articles = db.relationship('Article', backref='outlet', lazy=True)
     children = db.relationship('Outlet', backref=db.backref('parent', remote_side=[id]), lazy=True)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, stats=None):
+        """
+        Convert outlet to dictionary.
+        If stats (outlet id -> OutletStats) is provided, includes the article count and
+        latest publication date across this outlet and its children.
+        """
+        result = {
             "id": self.id,
             "name": self.name,
             "slug": self.slug,
@@ -184,6 +341,14 @@ class Outlet(db.Model):
             "logo_url": self.logo_url,
         }
 
+        if stats is not None:
+            outlet_stats = [stats[i] for i in [self.id] + [child.id for child in self.children] if i in stats]
+            latest = [s.latest_pub_date for s in outlet_stats if s.latest_pub_date]
+            result["article_count"] = sum(s.article_count for s in outlet_stats)
+            result["latest_pub_date"] = max(latest).isoformat() if latest else None
+
+        return result
+
 class Article(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
@@ -191,38 +356,628 @@ class Article(db.Model):
     link = db.Column(db.String(512), nullable=False, unique=True)
     text = db.Column(db.Text)
     author = db.Column(db.String(256))
-    pub_date = db.Column(db.DateTime)
+    pub_date = db.Column(db.DateTime, index=True)
     image_url = db.Column(db.String(512))
     audio_file = db.Column(db.String(512))
+    text_compressed = db.Column(db.LargeBinary)  # zlib-compressed body once archived
+    content_hash = db.Column(db.String(64))  # SHA-256 of text
+    feed_updated = db.Column(db.DateTime)  # feed entry's <updated> timestamp
+    last_scraped = db.Column(db.DateTime)
+    save_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)  # maintained on save/unsave
     outlet_id = db.Column(db.Integer, db.ForeignKey('outlet.id'), nullable=False)
 
-    def to_dict(self, user_id=None):
+    def get_text(self):
+        """Return the article body, decompressing it if it has been archived."""
+        if self.text is None and self.text_compressed is not None:
+            return zlib.decompress(self.text_compressed).decode("utf-8")
+        return self.text
+
+    def to_dict(self, user_id=None, fields=None, saved_ids=None):
         """
         Convert article to dictionary.
-        If user_id is provided, includes whether the user has saved this article.
+        If user_id is provided, includes whether the user has saved this article;
+        pass saved_ids (the user's saved article ids) to skip the per-article lookup.
+        If fields is provided, only those fields (plus id) are included.
         """
-        result = {
-            "id": self.id,
-            "title": self.title,
-            "link": self.link,
-            "text": self.text,
-            "author": self.author,
-            "pub_date": self.pub_date.isoformat() if self.pub_date else None,
-            "image_url": self.image_url,
-            "audio_file": self.audio_file,
-            "outlet": {
+        if fields is None:
+            fields = ARTICLE_FIELDS
+
+        result = {"id": self.id}
+
+        if "title" in fields:
+            result["title"] = self.title
+        if "link" in fields:
+            result["link"] = self.link
+        if "text" in fields:
+            result["text"] = self.get_text()
+        if "author" in fields:
+            result["author"] = self.author
+        if "pub_date" in fields:
+            result["pub_date"] = self.pub_date.isoformat() if self.pub_date else None
+        if "image_url" in fields:
+            result["image_url"] = self.image_url
+        if "audio_file" in fields:
+            result["audio_file"] = self.audio_file
+        if "save_count" in fields:
+            result["save_count"] = self.save_count
+        if "thumbnails" in fields:
+            # Versioned URLs: a new image_url yields new URLs, so clients can cache them forever
+            result["thumbnails"] = {
+                size: f"/images/{self.id}/{size}?v={thumbnail_version(self.image_url)}"
+                for size in THUMBNAIL_SIZES
+            } if self.image_url else None
+        if "outlet" in fields:
+            result["outlet"] = {
                 "id": self.outlet.id,
                 "name": self.outlet.name,
             }
-        }
 
-        if user_id is not None:
-            # Check if this article is saved by the user
-            user = User.query.get(user_id)
-            result["saved"] = user and self in user.saved_articles.all()
+        if user_id is not None and "saved" in fields:
+            if saved_ids is not None:
+                result["saved"] = self.id in saved_ids
+            else:
+                # Check if this article is saved by the user
+                user = User.query.get(user_id)
+                result["saved"] = user and self in user.saved_articles.all()
 
         return result
 
+
+def get_saved_ids(user_id, article_ids):
+    """Return which of the given article ids the user has saved, in one query."""
+    article_ids = list(article_ids)
+    if user_id is None or not article_ids:
+        return set()
+    return set(article_id for (article_id,) in db.session.query(saved_articles.c.article_id).filter(
+        saved_articles.c.user_id == user_id, saved_articles.c.article_id.in_(article_ids)))
+
+
+# Fields accepted by ?fields= on article endpoints
+ARTICLE_FIELDS = frozenset(["id", "title", "link", "text", "author", "pub_date", "image_url", "audio_file", "save_count", "thumbnails", "outlet", "saved"])
+
+
+def parse_article_fields(value):
+    """
+    Parse a comma-separated ?fields= value.
+    Returns None (all fields) if value is empty; raises ValueError on unknown field names.
+    """
+    if not value:
+        return None
+
+    fields = set(name.strip() for name in value.split(",") if name.strip())
+    unknown = sorted(fields - ARTICLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Invalid field(s): {', '.join(unknown)}")
+
+    return fields
+
+
+def article_query_options(fields):
+    """
+    Return query options that load only the columns needed for the given fields,
+    so unrequested columns (notably text) are never read from the database.
+    The outlet is always joined in the same query rather than lazy-loaded per article.
+    """
+    if fields is None:
+        return [db.joinedload(Article.outlet).load_only(Outlet.id, Outlet.name)]
+
+    field_columns = {
+        "title": [Article.title],
+        "link": [Article.link],
+        "text": [Article.text, Article.text_compressed],
+        "author": [Article.author],
+        "pub_date": [Article.pub_date],
+        "image_url": [Article.image_url],
+        "audio_file": [Article.audio_file],
+        "save_count": [Article.save_count],
+        "thumbnails": [Article.image_url],
+        "outlet": [Article.outlet_id],
+    }
+
+    columns = [Article.id]
+    for field in fields:
+        columns.extend(field_columns.get(field, []))
+
+    options = [db.load_only(*columns)]
+    if "outlet" in fields:
+        options.append(db.joinedload(Article.outlet).load_only(Outlet.id, Outlet.name))
+
+    return options
+
+
+class Change(db.Model):
+    """
+    Append-only change log used for delta sync.
+    The autoincrement id doubles as a monotonic sync token.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), nullable=False)  # "article", "saved" or "save_count"
+    article_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+
+def record_change(kind, article_id, user_id=None, deleted=False):
+    """Add a change log entry to the current session; the caller commits."""
+    db.session.add(Change(kind=kind, article_id=article_id, user_id=user_id, deleted=deleted))
+
+
+def latest_change_token():
+    """Return the sequence number of the most recent change (0 if none)."""
+    return db.session.query(db.func.max(Change.id)).scalar() or 0
+
+
+def compact_change_log():
+    """
+    Delete change log entries superseded by a later entry for the same article
+    (and user). Sync only reports the latest state per entry, so results are
+    unchanged for every token. Returns the number of rows deleted.
+    """
+    latest = db.session.query(db.func.max(Change.id)).group_by(Change.kind, Change.article_id, Change.user_id)
+    deleted = Change.query.filter(Change.id.not_in(latest.scalar_subquery())).delete(synchronize_session=False)
+    db.session.commit()
+    print(f"Compacted change log: removed {deleted} superseded entries")
+    return deleted
+
+
+class OutletStats(db.Model):
+    """
+    Materialized per-outlet aggregates, updated alongside ingest and retention
+    so /outlets never has to count the article table.
+    """
+    outlet_id = db.Column(db.Integer, db.ForeignKey('outlet.id'), primary_key=True)
+    article_count = db.Column(db.Integer, nullable=False, default=0)
+    latest_pub_date = db.Column(db.DateTime)
+
+
+def bump_outlet_stats(outlet_id, pub_date, delta):
+    """Adjust an outlet's article count (and latest pub_date on insert); the caller commits."""
+    stats = db.session.get(OutletStats, outlet_id)
+    if not stats:
+        stats = OutletStats(outlet_id=outlet_id, article_count=0)
+        db.session.add(stats)
+
+    stats.article_count = (stats.article_count or 0) + delta
+    if delta > 0 and pub_date and (stats.latest_pub_date is None or pub_date > stats.latest_pub_date):
+        stats.latest_pub_date = pub_date
+
+
+def bump_save_count(article, delta):
+    """
+    Atomically adjust an article's save count; the caller commits.
+    Also logs a "save_count" change so /sync clients pick up the new count
+    without downloading the whole article again.
+    """
+    article.save_count = Article.save_count + delta
+    record_change("save_count", article.id)
+
+
+def reconcile_stats():
+    """
+    Recompute all aggregate counters from the source tables and fix any drift.
+    Returns the number of outlets and articles whose counters were corrected.
+    """
+    counts = dict(
+        (outlet_id, (count, latest)) for outlet_id, count, latest in
+        db.session.query(Article.outlet_id, db.func.count(Article.id), db.func.max(Article.pub_date)).group_by(Article.outlet_id)
+    )
+    existing = {stats.outlet_id: stats for stats in OutletStats.query.all()}
+
+    fixed_outlets = 0
+    for (outlet_id,) in db.session.query(Outlet.id):
+        count, latest = counts.get(outlet_id, (0, None))
+        stats = existing.get(outlet_id)
+        if not stats:
+            stats = OutletStats(outlet_id=outlet_id)
+            db.session.add(stats)
+        if stats.article_count != count or stats.latest_pub_date != latest:
+            stats.article_count = count
+            stats.latest_pub_date = latest
+            fixed_outlets += 1
+
+    actual = db.select(db.func.count()).select_from(saved_articles).where(
+        saved_articles.c.article_id == Article.id
+    ).scalar_subquery()
+    drifted = [article_id for (article_id,) in db.session.query(Article.id).filter(Article.save_count != actual)]
+    fixed_articles = Article.query.filter(Article.id.in_(drifted)).update(
+        {Article.save_count: actual}, synchronize_session=False
+    ) if drifted else 0
+    for article_id in drifted:
+        record_change("save_count", article_id)
+
+    db.session.commit()
+    print(f"Reconciled stats: fixed {fixed_outlets} outlets, {fixed_articles} articles")
+    return {"outlets": fixed_outlets, "articles": fixed_articles}
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens, dropping stopwords and very short words."""
+    if not text:
+        return []
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def vectorize_article(title, text):
+    """
+    Build a unit-length hashed-feature vector from an article's title and body.
+    Each word is hashed to a bucket and a sign (feature hashing), counts are
+    log-scaled so long articles don't swamp short ones.
+    """
+    vector = np.zeros(RELATED_VECTOR_DIM, dtype=np.float32)
+
+    for words, weight in ((tokenize(title), RELATED_TITLE_WEIGHT), (tokenize(text), 1.0)):
+        if not words:
+            continue
+        hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint32, count=len(words))
+        buckets = (hashes % RELATED_VECTOR_DIM).astype(np.intp)
+        signs = np.where(hashes & 0x80000000, -weight, weight).astype(np.float32)
+        np.add.at(vector, buckets, signs)
+
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class RelatedIndex:
+    """
+    In-memory matrix of article vectors for related-article lookups.
+    Rows are added incrementally during ingest and the matrix is persisted to
+    disk so startup doesn't need to re-vectorize the whole corpus.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.loaded = False
+        self.dirty = False
+        self.load_lock = threading.Lock()
+        self.vectors = np.zeros((0, RELATED_VECTOR_DIM), dtype=np.float32)
+        self.coarse = np.zeros((0, RELATED_COARSE_DIM), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.size = 0
+        self.rows = {}  # article id -> row
+
+    @staticmethod
+    def project(vectors):
+        """Project full vectors to unit-length coarse vectors."""
+        coarse = vectors @ RELATED_PROJECTION
+        norms = np.linalg.norm(coarse, axis=-1, keepdims=True)
+        return np.divide(coarse, norms, out=np.zeros_like(coarse), where=norms > 0)
+
+    def add(self, article_id, title, text):
+        """Insert or replace an article's vector."""
+        vector = vectorize_article(title, text)
+        coarse = self.project(vector)
+
+        with self.lock:
+            row = self.rows.get(article_id)
+            if row is None:
+                if self.size == len(self.vectors):
+                    capacity = max(1024, 2 * len(self.vectors))
+                    vectors = np.zeros((capacity, RELATED_VECTOR_DIM), dtype=np.float32)
+                    vectors[:self.size] = self.vectors[:self.size]
+                    coarse_rows = np.zeros((capacity, RELATED_COARSE_DIM), dtype=np.float32)
+                    coarse_rows[:self.size] = self.coarse[:self.size]
+                    ids = np.full(capacity, -1, dtype=np.int64)
+                    ids[:self.size] = self.ids[:self.size]
+                    self.vectors, self.coarse, self.ids = vectors, coarse_rows, ids
+                row = self.size
+                self.size += 1
+                self.rows[article_id] = row
+                self.ids[row] = article_id
+            self.vectors[row] = vector
+            self.coarse[row] = coarse
+            self.dirty = True
+
+    def remove(self, article_id):
+        """Drop an article from the index (its row is zeroed so it never matches)."""
+        with self.lock:
+            row = self.rows.pop(article_id, None)
+            if row is not None:
+                self.vectors[row] = 0
+                self.coarse[row] = 0
+                self.ids[row] = -1
+                self.dirty = True
+
+    def related(self, article_id, k):
+        """
+        Return up to k (article_id, score) pairs most similar to the given article.
+        Small indexes are scanned exactly; larger ones pick candidates from the
+        coarse vectors in one pass, then rerank them with exact cosine similarity.
+        """
+        with self.lock:
+            row = self.rows.get(article_id)
+            if row is None or self.size == 0:
+                return []
+
+            k = min(k, self.size - 1)
+            if k <= 0:
+                return []
+
+            if self.size <= RELATED_RERANK_CANDIDATES:
+                candidates = np.arange(self.size)
+            else:
+                coarse_scores = self.coarse[:self.size] @ self.coarse[row]
+                kth = self.size - RELATED_RERANK_CANDIDATES
+                # Sorted row order keeps the rerank gather mostly sequential in memory
+                candidates = np.sort(np.argpartition(coarse_scores, kth)[kth:])
+
+            candidates = candidates[candidates != row]
+            scores = self.vectors[candidates] @ self.vectors[row]
+
+            k = min(k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            return [(int(self.ids[candidates[i]]), float(scores[i])) for i in top if scores[i] > 0]
+
+    def profile_similarity(self, profile_ids, candidate_ids):
+        """
+        Return {candidate_id: cosine similarity} between each candidate and the
+        centroid of the profile articles (e.g. a user's saved set).
+        """
+        with self.lock:
+            profile_rows = [self.rows[i] for i in profile_ids if i in self.rows]
+            candidates = [(i, self.rows[i]) for i in candidate_ids if i in self.rows]
+            if not profile_rows or not candidates:
+                return {}
+
+            profile = self.vectors[profile_rows].mean(axis=0)
+            norm = np.linalg.norm(profile)
+            if norm == 0:
+                return {}
+
+            scores = self.vectors[[row for _, row in candidates]] @ (profile / norm)
+            return {article_id: float(score) for (article_id, _), score in zip(candidates, scores)}
+
+    def save(self):
+        """Write the index to disk if it changed since the last save."""
+        if not self.path or not self.dirty:
+            return
+
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            # Only live rows are written, so removed articles are compacted away
+            live = self.ids[:self.size] >= 0
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, vectors=self.vectors[:self.size][live], ids=self.ids[:self.size][live], dim=RELATED_VECTOR_DIM)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def ensure_loaded(self, path):
+        """Load the index once; concurrent first callers wait instead of each rebuilding it."""
+        if self.loaded:
+            return
+        with self.load_lock:
+            if not self.loaded:
+                self.load_or_build(path)
+
+    def load_or_build(self, path):
+        """
+        Load the index from disk, then bring it in line with the database:
+        vectorize articles added since the last save and drop deleted ones.
+        """
+        self.path = path
+
+        if os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    if int(data["dim"]) == RELATED_VECTOR_DIM:
+                        with self.lock:
+                            self.vectors = data["vectors"].astype(np.float32)
+                            self.coarse = self.project(self.vectors)
+                            self.ids = data["ids"].astype(np.int64)
+                            self.size = len(self.ids)
+                            self.rows = {int(article_id): row for row, article_id in enumerate(self.ids)}
+            except Exception as e:
+                print(f"Error loading related index from {path}: {e}")
+
+        db_ids = set(article_id for (article_id,) in db.session.query(Article.id))
+        for article_id in set(self.rows) - db_ids:
+            self.remove(article_id)
+
+        missing = sorted(db_ids - set(self.rows))
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            articles = Article.query.options(db.load_only(Article.title, Article.text, Article.text_compressed)).filter(Article.id.in_(chunk)).all()
+            for article in articles:
+                self.add(article.id, article.title, article.get_text())
+
+        self.loaded = True
+        self.save()
+        print(f"Related index ready: {len(self.rows)} articles ({len(missing)} newly indexed)")
+
+
+related_index = RelatedIndex()
+
+
+# Personalized feed: candidates are the most recent articles, scored by
+# recency decay times affinity to the user's saved outlets and topics
+FEED_SIZE = 100
+FEED_CANDIDATES = 500
+FEED_RECENCY_HALF_LIFE_HOURS = 48
+
+
+class FeedEntry(db.Model):
+    """
+    Precomputed personalized feed row; /feed/me reads these ordered by score.
+    The score's inputs are stored too so save/unsave can rescore rows in place.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    outlet_id = db.Column(db.Integer)
+    recency = db.Column(db.Float)  # recency weight as of the last full rebuild
+    similarity = db.Column(db.Float)  # text similarity to the user's saved articles
+
+    __table_args__ = (db.Index('ix_feed_entry_user_score', 'user_id', 'score'),)
+
+
+_outlet_parents = None
+
+
+def outlet_parents():
+    """Return {outlet id: parent outlet id (or itself)}, cached since outlets rarely change."""
+    global _outlet_parents
+    if _outlet_parents is None:
+        _outlet_parents = {o.id: o.parent_outlet_id or o.id for o in Outlet.query.all()}
+    return _outlet_parents
+
+
+def feed_affinity(user_id, parents):
+    """
+    Return (saved article ids, outlet shares, parent outlet shares) for a user,
+    where a share is the fraction of the user's saves coming from that outlet.
+    """
+    saved = db.session.query(Article.id, Article.outlet_id).join(
+        saved_articles, saved_articles.c.article_id == Article.id
+    ).filter(saved_articles.c.user_id == user_id).all()
+
+    outlet_share = {}
+    parent_share = {}
+    for _, outlet_id in saved:
+        outlet_share[outlet_id] = outlet_share.get(outlet_id, 0) + 1 / len(saved)
+        parent = parents.get(outlet_id, outlet_id)
+        parent_share[parent] = parent_share.get(parent, 0) + 1 / len(saved)
+
+    return set(article_id for article_id, _ in saved), outlet_share, parent_share
+
+
+def feed_score(recency, outlet_id, similarity, outlet_share, parent_share, parents):
+    """Score = recency x (0.1 + outlet share + parent outlet share + text similarity)."""
+    affinity = (
+        outlet_share.get(outlet_id, 0)
+        + parent_share.get(parents.get(outlet_id, outlet_id), 0)
+        + max(similarity or 0, 0)
+    )
+    return (recency or 0) * (0.1 + affinity)
+
+
+def rebuild_user_feed(user_id, candidates=None, parents=None):
+    """
+    Recompute one user's materialized feed from the recent candidates; the caller commits.
+    Affinity combines how often the user saved from the article's outlet, from
+    its parent outlet, and the text similarity to the user's saved articles.
+    """
+    FeedEntry.query.filter_by(user_id=user_id).delete()
+
+    if parents is None:
+        parents = outlet_parents()
+    saved_ids, outlet_share, parent_share = feed_affinity(user_id, parents)
+    if not saved_ids:
+        return
+
+    if candidates is None:
+        candidates = db.session.query(Article.id, Article.outlet_id, Article.pub_date).order_by(
+            Article.pub_date.desc()).limit(FEED_CANDIDATES).all()
+
+    candidates = [c for c in candidates if c.id not in saved_ids]
+    similarity = related_index.profile_similarity(saved_ids, [c.id for c in candidates])
+
+    now = datetime.now()
+    entries = []
+    for c in candidates:
+        age_hours = max((now - c.pub_date).total_seconds() / 3600, 0) if c.pub_date else FEED_RECENCY_HALF_LIFE_HOURS * 4
+        recency = math.pow(0.5, age_hours / FEED_RECENCY_HALF_LIFE_HOURS)
+        sim = similarity.get(c.id, 0)
+        entries.append({
+            "user_id": user_id,
+            "article_id": c.id,
+            "score": feed_score(recency, c.outlet_id, sim, outlet_share, parent_share, parents),
+            "outlet_id": c.outlet_id,
+            "recency": recency,
+            "similarity": sim,
+        })
+
+    entries.sort(key=lambda e: e["score"], reverse=True)
+    db.session.bulk_insert_mappings(FeedEntry, entries[:FEED_SIZE])
+
+
+def update_user_feed(user_id):
+    """
+    Incrementally refresh a user's feed after a save/unsave; the caller commits.
+    Recomputes the user's affinity shares and profile similarity, then rescores
+    the stored entries in place and drops any that are now saved. Only a user
+    with no stored feed yet (e.g. their first save) gets a full rebuild.
+    """
+    parents = outlet_parents()
+    saved_ids, outlet_share, parent_share = feed_affinity(user_id, parents)
+
+    if not saved_ids:
+        FeedEntry.query.filter_by(user_id=user_id).delete()
+        return
+
+    entries = FeedEntry.query.filter_by(user_id=user_id).all()
+    if not entries:
+        rebuild_user_feed(user_id, parents=parents)
+        return
+
+    similarity = related_index.profile_similarity(saved_ids, [e.article_id for e in entries])
+    for entry in entries:
+        if entry.article_id in saved_ids:
+            db.session.delete(entry)
+            continue
+        entry.similarity = similarity.get(entry.article_id, 0)
+        entry.score = feed_score(entry.recency, entry.outlet_id, entry.similarity, outlet_share, parent_share, parents)
+
+
+def rebuild_user_feeds():
+    """Recompute the materialized feed of every user with saved articles (run after ingest)."""
+    parents = outlet_parents()
+    candidates = db.session.query(Article.id, Article.outlet_id, Article.pub_date).order_by(
+        Article.pub_date.desc()).limit(FEED_CANDIDATES).all()
+    user_ids = [user_id for (user_id,) in db.session.query(saved_articles.c.user_id).distinct()]
+
+    for user_id in user_ids:
+        rebuild_user_feed(user_id, candidates=candidates, parents=parents)
+
+    db.session.commit()
+    print(f"Rebuilt personalized feeds for {len(user_ids)} users")
+
+
+# Columns added to the article table after the initial release. db.create_all()
+# only creates missing tables, so existing databases get these via migrate_schema().
+ARTICLE_COLUMN_MIGRATIONS = [
+    ("text_compressed", "BLOB"),
+    ("content_hash", "VARCHAR(64)"),
+    ("feed_updated", "DATETIME"),
+    ("last_scraped", "DATETIME"),
+    ("save_count", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+FEED_ENTRY_COLUMN_MIGRATIONS = [
+    ("outlet_id", "INTEGER"),
+    ("recency", "FLOAT"),
+    ("similarity", "FLOAT"),
+]
+
+ARTICLE_INDEX_MIGRATIONS = [
+    ("ix_article_pub_date", "pub_date"),
+    ("ix_article_save_count", "save_count"),
+]
+
+
+def migrate_schema():
+    """
+    Bring an existing database up to the current schema. Safe to run on every
+    startup: columns are only added if missing and indexes use IF NOT EXISTS.
+    Run after db.create_all() so new tables already exist.
+    """
+    for table, columns in (("article", ARTICLE_COLUMN_MIGRATIONS), ("feed_entry", FEED_ENTRY_COLUMN_MIGRATIONS)):
+        existing = set(row[1] for row in db.session.execute(db.text(f"PRAGMA table_info({table})")))
+
+        for name, ddl in columns:
+            if name not in existing:
+                db.session.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+                print(f"Added column {table}.{name}")
+
+    for index_name, column in ARTICLE_INDEX_MIGRATIONS:
+        db.session.execute(db.text(f"CREATE INDEX IF NOT EXISTS {index_name} ON article ({column})"))
+
+    db.session.commit()
+
+
 def initialize_outlets():
     """Create the news outlets if they don't exist."""
     # First, create the parent Cornell Chronicle outlet
@@ -530,22 +1285,98 @@ def initialize_outlets():
 
     db.session.commit()
 
+    global _outlet_parents
+    _outlet_parents = None
+
+
+def needs_rescrape(article, feed_updated, now):
+    """
+    Decide whether an existing article should be scraped again.
+    True if the feed reports a newer update than we have stored, or if the
+    article is still inside the freshness window. Either way an article is
+    scraped at most once per RESCRAPE_MIN_INTERVAL, so a page that keeps
+    failing to scrape isn't fetched again for every feed that lists it.
+    """
+    if article.text is None and article.text_compressed is not None:
+        # Archived articles are never refreshed
+        return False
+
+    if article.last_scraped and now - article.last_scraped < RESCRAPE_MIN_INTERVAL:
+        return False
+
+    if feed_updated and (article.feed_updated is None or feed_updated > article.feed_updated):
+        return True
+
+    return article.pub_date is not None and article.pub_date > now - RESCRAPE_FRESHNESS_WINDOW
+
+
+def refresh_article(article, entry, feed_updated, now):
+    """
+    Re-scrape an existing article and write it only if its content changed.
+    Cached TTS audio is invalidated when the body changes. Returns True if the
+    article was updated.
+    """
+    # last_scraped records the attempt (it throttles all retries), but
+    # feed_updated only advances once the new version was actually fetched,
+    # so a failed scrape is retried after RESCRAPE_MIN_INTERVAL.
+    article.last_scraped = now
+
+    text = scrape_article_content(article.link)
+    if not text:
+        return False
+
+    article.feed_updated = feed_updated or article.feed_updated
+
+    old_hash = article.content_hash or compute_content_hash(article.text)
+    new_hash = compute_content_hash(text)
+    title = getattr(entry, "title", None) or article.title
+    image_url = get_image_url(entry) or article.image_url
+
+    if new_hash == old_hash and title == article.title and image_url == article.image_url:
+        article.content_hash = new_hash
+        return False
+
+    if new_hash != old_hash:
+        article.text = text
+        article.content_hash = new_hash
+
+        if article.audio_file:
+            audio_path = os.path.join('audios', article.audio_file)
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            article.audio_file = None
+
+    article.title = title
+    article.image_url = image_url
+    record_change("article", article.id)
+    related_index.add(article.id, article.title, article.text)
+    return True
+
 
 def fetch_and_store_feeds():
-    """Fetch all outlets' feeds and store new articles."""
+    """
+    Fetch all outlets' feeds, store new articles and refresh existing ones
+    that the feed reports as updated or that are still fresh.
+    """
     outlets = Outlet.query.filter(Outlet.rss_feed != None).all()
 
     for outlet in outlets:
         try:
             feed = feedparser.parse(outlet.rss_feed)
+            now = datetime.now()
 
             for entry in feed.entries:
                 link = getattr(entry, "link", None)
                 if not link:
                     continue
 
-                # Check if article already exists
-                if Article.query.filter_by(link=link).first():
+                feed_updated = parse_updated_date(entry)
+
+                # Existing articles are only re-scraped when they may have changed
+                existing = Article.query.filter_by(link=link).first()
+                if existing:
+                    if needs_rescrape(existing, feed_updated, now) and refresh_article(existing, entry, feed_updated, now):
+                        print(f"Article updated: {link}")
                     continue
 
                 # # Get text from RSS feed first
@@ -563,12 +1394,130 @@ def fetch_and_store_feeds():
                     author=getattr(entry, "author", None),
                     pub_date=parse_pub_date(entry),
                     image_url=get_image_url(entry),
+                    content_hash=compute_content_hash(text),
+                    feed_updated=feed_updated,
+                    last_scraped=now,
                     outlet_id=outlet.id,
                 )
 
                 db.session.add(article)
+                db.session.flush()
+                record_change("article", article.id)
+                bump_outlet_stats(outlet.id, article.pub_date, 1)
+                related_index.add(article.id, article.title, text)
 
             db.session.commit()
             print(f"Feed updated for outlet: {outlet.name}")
         except Exception as e:
             print(f"Error fetching feed for outlet {outlet.name} ({outlet.rss_feed}): {e}")
+
+    related_index.save()
+
+
+# Rows processed per transaction by the retention job
+RETENTION_BATCH_SIZE = 500
+
+
+def database_file_size():
+    """Return the size of the SQLite database file in bytes (None if not file-backed)."""
+    path = db.engine.url.database
+    if not path or path == ":memory:" or not os.path.exists(path):
+        return None
+    return os.path.getsize(path)
+
+
+def reclaim_database_space():
+    """
+    Return freed pages to the filesystem. The first run switches the database
+    to incremental auto-vacuum (which needs one full VACUUM); later runs only
+    release the free pages left by the retention job.
+    """
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+        else:
+            # executescript steps the pragma to completion; a plain execute frees a single page
+            conn.connection.driver_connection.executescript("PRAGMA incremental_vacuum;")
+
+
+def apply_retention(archive_after_days, purge_after_days=None):
+    """
+    Archive and optionally purge old articles.
+    Bodies of articles older than archive_after_days are moved into zlib-compressed
+    storage. If purge_after_days is set, older articles that no user has saved are
+    deleted outright. Rows are processed in batches, then the freed space is
+    returned to the filesystem. Returns the number of articles affected, the
+    logical bytes saved and the actual bytes reclaimed on disk.
+    """
+    now = datetime.now()
+    stats = {"archived": 0, "purged": 0, "logical_bytes": 0, "bytes_reclaimed": 0}
+    size_before = database_file_size()
+    audio_bytes = 0
+
+    if purge_after_days is not None:
+        purge_cutoff = now - timedelta(days=purge_after_days)
+
+        while True:
+            expired = Article.query.filter(
+                Article.pub_date < purge_cutoff,
+                ~Article.saved_by_users.any()
+            ).order_by(Article.id).limit(RETENTION_BATCH_SIZE).all()
+            if not expired:
+                break
+
+            for article in expired:
+                stats["logical_bytes"] += len(article.text.encode("utf-8")) if article.text else 0
+                stats["logical_bytes"] += len(article.text_compressed) if article.text_compressed else 0
+
+                if article.audio_file:
+                    audio_path = os.path.join('audios', article.audio_file)
+                    if os.path.exists(audio_path):
+                        audio_bytes += os.path.getsize(audio_path)
+                        os.remove(audio_path)
+
+                record_change("article", article.id, deleted=True)
+                related_index.remove(article.id)
+                FeedEntry.query.filter_by(article_id=article.id).delete()
+                bump_outlet_stats(article.outlet_id, None, -1)
+                db.session.delete(article)
+                stats["purged"] += 1
+
+            db.session.commit()
+
+        related_index.save()
+
+    archive_cutoff = now - timedelta(days=archive_after_days)
+    last_id = 0
+
+    while True:
+        stale = Article.query.filter(
+            Article.id > last_id,
+            Article.pub_date < archive_cutoff,
+            Article.text != None
+        ).order_by(Article.id).limit(RETENTION_BATCH_SIZE).all()
+        if not stale:
+            break
+
+        for article in stale:
+            raw = article.text.encode("utf-8")
+            compressed = zlib.compress(raw, 9)
+            article.text_compressed = compressed
+            article.text = None
+            stats["logical_bytes"] += len(raw) - len(compressed)
+            stats["archived"] += 1
+
+        last_id = stale[-1].id
+        db.session.commit()
+
+    if size_before is not None:
+        # The batches are already committed; a busy database only delays reclaiming space
+        try:
+            reclaim_database_space()
+        except (OperationalError, sqlite3.OperationalError) as e:
+            print(f"Error reclaiming database space: {e}")
+        stats["bytes_reclaimed"] = size_before - database_file_size()
+    stats["bytes_reclaimed"] += audio_bytes
+
+    print(f"Retention: archived {stats['archived']}, purged {stats['purged']}, reclaimed {stats['bytes_reclaimed']} bytes on disk ({stats['logical_bytes']} logical)")
+    return stats
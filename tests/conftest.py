@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+# Point the app at a throwaway database and working directory before it is imported,
+# so tests never touch articles.db, audios/, thumbnails/ or flask_session/.
+_workdir = tempfile.mkdtemp(prefix="scope-tests-")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(_workdir, "test.db"))
+os.chdir(_workdir)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app import app as flask_app
+from db import db
+
+
+@pytest.fixture
+def app():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,63 @@
+import pytest
+
+from db import db, Article, Outlet
+
+
+@pytest.fixture
+def articles(app):
+    outlet = Outlet(name="Sun", slug="sun")
+    db.session.add(outlet)
+    db.session.flush()
+    for i in range(3):
+        db.session.add(Article(title=f"Article {i}", link=f"https://example.com/{i}", outlet_id=outlet.id))
+    db.session.commit()
+    return [a.id for a in Article.query.order_by(Article.id)]
+
+
+def test_get_returns_requested_order_and_missing(client, articles):
+    ids = [articles[2], 999, articles[0]]
+    resp = client.get("/articles/batch?ids=" + ",".join(str(i) for i in ids))
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert [a["id"] for a in body] == ids
+    assert body[1]["error"] == "Article not found"
+
+
+def test_post_returns_articles(client, articles):
+    resp = client.post("/articles/batch", json={"ids": articles})
+    assert resp.status_code == 200
+    assert [a["id"] for a in resp.get_json()] == articles
+
+
+@pytest.mark.parametrize("body", [[1, 2], "1,2", 5, None, {}, {"ids": []}, {"ids": "1,2"}])
+def test_post_rejects_malformed_body(client, articles, body):
+    resp = client.post("/articles/batch", json=body)
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize("ids", [[1.7], [True], ["1"], [None], [[1]], [0], [-1], [2**63], [2**70]])
+def test_post_rejects_non_integer_ids(client, articles, ids):
+    resp = client.post("/articles/batch", json={"ids": ids})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Invalid article id"
+
+
+@pytest.mark.parametrize("query", ["1.7", "abc", "1,-2", "true", "%C2%B2", "%D9%A3", "0", "9223372036854775808", "99999999999999999999999"])
+def test_get_rejects_non_integer_ids(client, articles, query):
+    resp = client.get("/articles/batch?ids=" + query)
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Invalid article id"
+
+
+def test_accepts_largest_sqlite_id(client, articles):
+    resp = client.get("/articles/batch?ids=9223372036854775807")
+    assert resp.status_code == 200
+    assert resp.get_json() == [{"id": 2**63 - 1, "error": "Article not found"}]
+
+    resp = client.post("/articles/batch", json={"ids": [2**63 - 1]})
+    assert resp.status_code == 200
+
+
+def test_rejects_too_many_ids(client, app, articles):
+    resp = client.post("/articles/batch", json={"ids": list(range(1, app.config["MAX_BATCH_SIZE"] + 2))})
+    assert resp.status_code == 400
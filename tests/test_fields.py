@@ -0,0 +1,32 @@
+import pytest
+
+from db import db, Article, Outlet
+
+
+@pytest.fixture
+def article_id(app):
+    outlet = Outlet(name="Sun", slug="sun")
+    db.session.add(outlet)
+    db.session.flush()
+    article = Article(title="Article", link="https://example.com/a", text="body", outlet_id=outlet.id)
+    db.session.add(article)
+    db.session.commit()
+    return article.id
+
+
+@pytest.mark.parametrize("path", [
+    "/articles", "/articles/{id}", "/articles/batch?ids={id}", "/articles/top/5",
+    "/articles/most-saved/5", "/articles/trending/5", "/articles/{id}/related",
+    "/articles/outlet/1", "/articles/outlet/1/top/5", "/sync",
+])
+def test_unknown_field_is_rejected(client, article_id, path):
+    url = path.format(id=article_id)
+    resp = client.get(url + ("&" if "?" in url else "?") + "fields=title,bogus")
+    assert resp.status_code == 400
+    assert "bogus" in resp.get_json()["error"]
+
+
+def test_fields_limit_payload(client, article_id):
+    resp = client.get(f"/articles/{article_id}?fields=title")
+    assert resp.status_code == 200
+    assert resp.get_json() == {"id": article_id, "title": "Article"}
@@ -0,0 +1,142 @@
+import functools
+import http.server
+import io
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+import app as app_module
+import db as db_module
+from db import db, Article, Outlet
+
+
+class ImageHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that counts requests and stays quiet."""
+
+    def do_GET(self):
+        self.server.hits += 1
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_server(tmp_path):
+    """Local stand-in for a publisher's image host, serving a generated 1200x800 PNG."""
+    root = tmp_path / "images"
+    root.mkdir()
+    Image.new("RGB", (1200, 800), "red").save(root / "photo.png")
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ImageHandler, directory=str(root)))
+    server.hits = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def thumbnail_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "thumbnails")
+    monkeypatch.setattr(db_module, "THUMBNAIL_DIR", path)
+    monkeypatch.setattr(app_module, "THUMBNAIL_DIR", path)
+    return path
+
+
+def create_article(image_url, slug="sun"):
+    outlet = Outlet.query.filter_by(slug=slug).first()
+    if not outlet:
+        outlet = Outlet(name=slug, slug=slug)
+        db.session.add(outlet)
+        db.session.flush()
+    article = Article(title="Title", link=f"https://example.com/{Article.query.count()}", image_url=image_url, outlet_id=outlet.id)
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+def image_url(server):
+    return f"http://127.0.0.1:{server.server_port}/photo.png"
+
+
+def thumbnail_url(client, article_id, size):
+    return client.get(f"/articles/{article_id}?fields=thumbnails").get_json()["thumbnails"][size]
+
+
+def test_generates_every_size(client, image_server, thumbnail_dir):
+    article = create_article(image_url(image_server))
+
+    for size, width in db_module.THUMBNAIL_SIZES.items():
+        response = client.get(thumbnail_url(client, article.id, size))
+        assert response.status_code == 200
+        assert response.mimetype == "image/webp"
+        assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert Image.open(io.BytesIO(response.data)).size == (width, round(width * 800 / 1200))
+
+
+def test_original_fetched_once(client, image_server, thumbnail_dir):
+    article = create_article(image_url(image_server))
+
+    client.get(thumbnail_url(client, article.id, "small"))
+    client.get(thumbnail_url(client, article.id, "small"))
+    client.get(thumbnail_url(client, article.id, "large"))
+
+    assert image_server.hits == 1
+    assert len(os.listdir(thumbnail_dir)) == len(db_module.THUMBNAIL_SIZES)
+
+
+def test_unversioned_url_is_not_immutable(client, image_server, thumbnail_dir):
+    article = create_article(image_url(image_server))
+
+    response = client.get(f"/images/{article.id}/small")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=300"
+    assert response.headers.get("ETag")
+
+
+def test_evicts_least_recently_used(client, image_server, thumbnail_dir, monkeypatch):
+    first = create_article(image_url(image_server))
+    client.get(f"/images/{first.id}/small")
+    for name in os.listdir(thumbnail_dir):
+        os.utime(os.path.join(thumbnail_dir, name), (0, 0))
+
+    # Leave room for roughly one article's worth of thumbnails
+    cache_size = sum(os.path.getsize(os.path.join(thumbnail_dir, name)) for name in os.listdir(thumbnail_dir))
+    monkeypatch.setattr(db_module, "THUMBNAIL_CACHE_MAX_BYTES", cache_size)
+
+    second = create_article(image_url(image_server))
+    assert client.get(f"/images/{second.id}/small").status_code == 200
+
+    remaining = os.listdir(thumbnail_dir)
+    assert not any(name.startswith(f"{first.id}_") for name in remaining)
+    assert any(name.startswith(f"{second.id}_") for name in remaining)
+
+
+def test_rejects_oversized_original(client, image_server, thumbnail_dir, monkeypatch):
+    monkeypatch.setattr(db_module, "MAX_SOURCE_IMAGE_BYTES", 100)
+    article = create_article(image_url(image_server))
+
+    response = client.get(f"/images/{article.id}/small")
+    assert response.status_code == 502
+    assert not os.path.exists(thumbnail_dir) or os.listdir(thumbnail_dir) == []
+
+
+def test_invalid_size(client, image_server, thumbnail_dir):
+    article = create_article(image_url(image_server))
+    assert client.get(f"/images/{article.id}/huge").status_code == 400
+
+
+def test_missing_article(client, thumbnail_dir):
+    assert client.get("/images/999/small").status_code == 404
+
+
+def test_article_without_image(client, thumbnail_dir):
+    article = create_article(None)
+    response = client.get(f"/images/{article.id}/small")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Article has no image"}
+    assert client.get(f"/articles/{article.id}?fields=thumbnails").get_json()["thumbnails"] is None
@@ -0,0 +1,108 @@
+import os
+from datetime import datetime, timedelta
+
+import feedparser
+import pytest
+
+import db as db_module
+from db import db, Article, Outlet, Change, fetch_and_store_feeds, compute_content_hash
+
+LINK = "https://example.com/story"
+
+
+@pytest.fixture
+def feeds(app, monkeypatch):
+    """Two overlapping outlet feeds that both list LINK; returns a setter for its `updated` time."""
+    for slug in ("news", "campus"):
+        db.session.add(Outlet(name=slug, slug=slug, rss_feed=f"https://example.com/{slug}.xml"))
+    db.session.commit()
+
+    state = {"updated": datetime.now()}
+
+    def parse(url):
+        entry = feedparser.FeedParserDict(
+            link=LINK, title="Story",
+            published_parsed=(datetime.now() - timedelta(days=2)).timetuple(),
+            updated_parsed=state["updated"].timetuple(),
+        )
+        return feedparser.FeedParserDict(entries=[entry])
+
+    monkeypatch.setattr(db_module.feedparser, "parse", parse)
+
+    def set_updated(when):
+        state["updated"] = when
+    return set_updated
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    """Stub scraper that records calls and returns the configured body."""
+    calls = {"count": 0, "text": "original body"}
+
+    def scrape(link):
+        calls["count"] += 1
+        return calls["text"]
+
+    monkeypatch.setattr(db_module, "scrape_article_content", scrape)
+    return calls
+
+
+@pytest.fixture
+def article(feeds, scraper):
+    fetch_and_store_feeds()
+    article = Article.query.filter_by(link=LINK).one()
+    # Pretend the first scrape happened long ago so the next cycle may scrape again
+    article.last_scraped = datetime.now() - timedelta(hours=1)
+    db.session.commit()
+    scraper["count"] = 0
+    return article
+
+
+def age_last_scrape(article):
+    article.last_scraped -= timedelta(hours=1)
+    db.session.commit()
+
+
+def test_failed_scrape_is_retried_but_throttled(feeds, scraper, article):
+    feeds(datetime.now() + timedelta(minutes=1))
+    scraper["text"] = None
+
+    fetch_and_store_feeds()
+    # Both feeds list the link, but the page is only fetched once per interval
+    assert scraper["count"] == 1
+    fetch_and_store_feeds()
+    assert scraper["count"] == 1
+    assert article.text == "original body"
+
+    age_last_scrape(article)
+    scraper["text"] = "updated body"
+    fetch_and_store_feeds()
+    assert scraper["count"] == 2
+    assert article.text == "updated body"
+
+
+def test_same_hash_scrape_does_not_write(feeds, scraper, article):
+    changes = Change.query.count()
+    feeds(datetime.now() + timedelta(minutes=1))
+
+    fetch_and_store_feeds()
+    assert scraper["count"] == 1
+    assert Change.query.count() == changes
+    assert article.content_hash == compute_content_hash("original body")
+
+
+def test_changed_body_clears_audio(feeds, scraper, article):
+    os.makedirs("audios", exist_ok=True)
+    with open("audios/story.mp3", "wb") as f:
+        f.write(b"audio")
+    article.audio_file = "story.mp3"
+    db.session.commit()
+
+    feeds(datetime.now() + timedelta(minutes=1))
+    scraper["text"] = "rewritten body"
+    fetch_and_store_feeds()
+
+    assert article.text == "rewritten body"
+    assert article.audio_file is None
+    assert not os.path.exists("audios/story.mp3")
+    assert Change.query.filter_by(kind="article", article_id=article.id).count() == 2
@@ -0,0 +1,82 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import db as db_module
+from db import db, Article, Outlet, OutletStats, apply_retention, reconcile_stats
+
+BODY = "A long article body about campus news. " * 50
+
+
+@pytest.fixture
+def articles(app):
+    """An old article, an old article the user saved, and a recent article."""
+    outlet = Outlet(name="Sun", slug="sun")
+    db.session.add(outlet)
+    db.session.flush()
+    now = datetime.now()
+    ages = {"old": 90, "saved": 90, "recent": 1}
+    ids = {}
+    for name, days in ages.items():
+        article = Article(title=name, link=f"https://example.com/{name}", text=BODY, pub_date=now - timedelta(days=days), outlet_id=outlet.id)
+        db.session.add(article)
+        db.session.flush()
+        ids[name] = article.id
+    db.session.commit()
+    reconcile_stats()
+    return ids
+
+
+@pytest.fixture
+def user_client(client, articles):
+    resp = client.post("/auth/register", json={"username": "reader", "email": "reader@example.com", "password": "pw"})
+    assert resp.status_code in (200, 201)
+    assert client.post(f"/articles/{articles['saved']}/save").status_code == 200
+    return client
+
+
+def test_purge_keeps_saved_articles(user_client, articles):
+    stats = apply_retention(archive_after_days=30, purge_after_days=60)
+
+    assert stats["purged"] == 1
+    assert db.session.get(Article, articles["old"]) is None
+    assert db.session.get(Article, articles["saved"]) is not None
+    assert db.session.get(Article, articles["recent"]) is not None
+    assert OutletStats.query.one().article_count == 2
+
+
+def test_archived_body_round_trips(client, articles):
+    stats = apply_retention(archive_after_days=30)
+
+    assert stats["archived"] == 2 and stats["purged"] == 0
+    assert stats["logical_bytes"] > 0
+    article = db.session.get(Article, articles["old"])
+    assert article.text is None and article.text_compressed is not None
+
+    resp = client.get(f"/articles/{articles['old']}")
+    assert resp.status_code == 200
+    assert resp.get_json()["text"] == BODY
+    assert db.session.get(Article, articles["recent"]).text == BODY
+
+    # Already archived rows are skipped on the next run
+    assert apply_retention(archive_after_days=30)["archived"] == 0
+
+
+def test_purged_articles_are_sync_tombstones(user_client, articles):
+    token = user_client.get("/sync").get_json()["token"]
+    apply_retention(archive_after_days=30, purge_after_days=60)
+
+    body = user_client.get(f"/sync?since={token}").get_json()
+    assert body["deleted"] == [articles["old"]]
+
+
+def test_failed_vacuum_still_reports_stats(client, articles, monkeypatch):
+    def busy():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db_module, "reclaim_database_space", busy)
+    stats = apply_retention(archive_after_days=30, purge_after_days=60)
+
+    assert stats["purged"] == 2
+    assert Article.query.count() == 1
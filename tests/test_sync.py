@@ -0,0 +1,147 @@
+import pytest
+from sqlalchemy import event
+
+from db import db, Article, Outlet, record_change, reconcile_stats
+
+
+@pytest.fixture
+def outlet_id(app):
+    outlet = Outlet(name="Sun", slug="sun")
+    db.session.add(outlet)
+    db.session.commit()
+    return outlet.id
+
+
+def add_article(outlet_id, n):
+    article = Article(title=f"Article {n}", link=f"https://example.com/{n}", text="body", outlet_id=outlet_id)
+    db.session.add(article)
+    db.session.flush()
+    record_change("article", article.id)
+    db.session.commit()
+    return article.id
+
+
+@pytest.fixture
+def article_id(outlet_id):
+    return add_article(outlet_id, 0)
+
+
+def register(client, name):
+    resp = client.post("/auth/register", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+    assert resp.status_code in (200, 201)
+
+
+@pytest.fixture
+def queries(app):
+    """Counts SQL statements executed while the test runs."""
+    counter = {"count": 0}
+
+    def count(*args):
+        counter["count"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    yield counter
+    event.remove(db.engine, "before_cursor_execute", count)
+
+
+def test_snapshot_then_delta(client, outlet_id, article_id):
+    snapshot = client.get("/sync").get_json()
+    assert [a["id"] for a in snapshot["articles"]] == [article_id]
+    assert snapshot["deleted"] == []
+
+    body = client.get(f"/sync?since={snapshot['token']}").get_json()
+    assert body["token"] == snapshot["token"]
+    assert body["articles"] == [] and body["deleted"] == []
+
+    new_id = add_article(outlet_id, 1)
+    body = client.get(f"/sync?since={snapshot['token']}&fields=title").get_json()
+    assert body["articles"] == [{"id": new_id, "title": "Article 1"}]
+    assert body["token"] > snapshot["token"]
+
+
+def test_deleted_article_is_a_tombstone(client, article_id):
+    token = client.get("/sync").get_json()["token"]
+    db.session.delete(db.session.get(Article, article_id))
+    record_change("article", article_id, deleted=True)
+    db.session.commit()
+
+    body = client.get(f"/sync?since={token}").get_json()
+    assert body["articles"] == []
+    assert body["deleted"] == [article_id]
+
+
+@pytest.mark.parametrize("since", ["abc", "-1", "1.5"])
+def test_invalid_token(client, article_id, since):
+    assert client.get(f"/sync?since={since}").status_code == 400
+
+
+def test_token_ahead_of_server_requires_full_resync(client, article_id):
+    token = client.get("/sync").get_json()["token"]
+    resp = client.get(f"/sync?since={token + 1}")
+    assert resp.status_code == 409
+    assert resp.get_json() == {"error": "Full resync required", "token": token}
+
+
+def test_saved_status_is_looked_up_once(client, outlet_id, queries):
+    register(client, "reader")
+    ids = [add_article(outlet_id, n) for n in range(20)]
+    assert client.post(f"/articles/{ids[0]}/save").status_code == 200
+
+    queries["count"] = 0
+    snapshot = client.get("/sync").get_json()
+    assert queries["count"] <= 5
+    assert snapshot["saved"] == [ids[0]]
+    assert [a["id"] for a in snapshot["articles"] if a["saved"]] == [ids[0]]
+
+    for n in range(20, 40):
+        add_article(outlet_id, n)
+    queries["count"] = 0
+    body = client.get(f"/sync?since={snapshot['token']}").get_json()
+    assert len(body["articles"]) == 20
+    assert queries["count"] <= 6
+
+
+def test_save_count_change_reaches_other_clients(app, article_id):
+    reader, saver = app.test_client(), app.test_client()
+    register(reader, "reader")
+    register(saver, "saver")
+    token = reader.get("/sync").get_json()["token"]
+
+    assert saver.post(f"/articles/{article_id}/save").status_code == 200
+    body = reader.get(f"/sync?since={token}").get_json()
+    assert body["save_counts"] == [{"id": article_id, "save_count": 1}]
+    # The article itself isn't resent for a count change
+    assert body["articles"] == []
+    assert body["saved"] == []
+    assert reader.get(f"/sync?since={token}&fields=title").get_json()["save_counts"] == []
+
+    assert saver.delete(f"/articles/{article_id}/unsave").status_code == 200
+    body = reader.get(f"/sync?since={body['token']}").get_json()
+    assert body["save_counts"] == [{"id": article_id, "save_count": 0}]
+
+
+def test_save_counts_skipped_for_resent_articles(app, outlet_id, article_id):
+    saver = app.test_client()
+    register(saver, "saver")
+    token = saver.get("/sync").get_json()["token"]
+
+    assert saver.post(f"/articles/{article_id}/save").status_code == 200
+    record_change("article", article_id)
+    db.session.commit()
+
+    body = saver.get(f"/sync?since={token}").get_json()
+    assert [(a["id"], a["save_count"], a["saved"]) for a in body["articles"]] == [(article_id, 1, True)]
+    assert body["save_counts"] == []
+
+
+def test_reconcile_logs_corrected_counts(client, article_id):
+    token = client.get("/sync").get_json()["token"]
+    Article.query.filter_by(id=article_id).update({Article.save_count: 5})
+    db.session.commit()
+
+    assert reconcile_stats()["articles"] == 1
+    body = client.get(f"/sync?since={token}").get_json()
+    assert body["save_counts"] == [{"id": article_id, "save_count": 0}]
+
+    assert reconcile_stats()["articles"] == 0
+    assert client.get(f"/sync?since={body['token']}").get_json()["save_counts"] == []